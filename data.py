@@ -1,92 +1,172 @@
 import os
+import io
 import csv
 import numpy as np
+import ezdxf
+from ezdxf.filemanagement import dxf_stream_info
 import foldable_robotics.dxf as dxf
 import shapely.geometry as sg
 
 
 def read(path):
+    layers_comp, comps_layer, zs, joints = read_tables(path)
+
+    # Read polys within each layer of each component
+    comps_poly = {}
+    comps_circle = {}
+    for comp in comps_layer:
+        comps_poly[comp] = {}
+        comps_circle[comp] = {}
+        for l in comps_layer[comp]:
+            polys, circles = read_component(path, comp, l)
+            comps_poly[comp][l] = polys
+            comps_circle[comp][l] = circles
+
+    joint_lines(joints, comps_poly, zs)
+
+    return comps_poly, comps_circle, joints, layers_comp
+
+
+def read_tables(path):
+    with open(os.path.join(path, 'layers.csv'), newline='') as layers_file, \
+            open(os.path.join(path, 'rev_joints.csv'),
+                 newline='') as joints_file:
+        return parse_tables(layers_file, joints_file)
+
+
+def parse_tables(layers_file, joints_file):
     # Read layers and components realtionship
     layers_comp = {}  # components within each layer
     comps_layer = {}  # layers of each component
     zs = {}  # thickness of each layer
-    with open(os.path.join(path, 'layers.csv'), newline='') as f:
-        reader = csv.reader(f)
-        for i, row in enumerate(reader):
-            if i == 0:
-                continue
-            l = int(row[0])
-            comp = row[1]
-            z_start = float(row[2])
-
-            if l not in layers_comp:
-                layers_comp[l] = [comp]
-            else:
-                layers_comp[l].append(comp)
-
-            if comp not in comps_layer:
-                comps_layer[comp] = [l]
-            else:
-                comps_layer[comp].append(l)
-
-            if l not in zs:
-                zs[l] = z_start
+    reader = csv.reader(layers_file)
+    for i, row in enumerate(reader):
+        if i == 0:
+            continue
+        l = int(row[0])
+        comp = row[1]
+        z_start = float(row[2])
+
+        if l not in layers_comp:
+            layers_comp[l] = [comp]
+        else:
+            layers_comp[l].append(comp)
+
+        if comp not in comps_layer:
+            comps_layer[comp] = [l]
+        else:
+            comps_layer[comp].append(l)
+
+        if l not in zs:
+            zs[l] = z_start
 
     # Read joints data
     joints = []
-    with open(os.path.join(path, 'rev_joints.csv'), newline='') as f:
-        reader = csv.reader(f)
-        for i, row in enumerate(reader):
-            if i == 0:
-                continue
-
-            name = row[0]
-            compA = row[1]
-            compB = row[2]
-            pt = [float(val) for val in row[3:6]]
-            dir = [float(val) for val in row[6:9]]
-
-            type = name.split('=')
-            assert len(
-                type) <= 2, 'Incorrect joint name format. Name of joints should be JOINTNAME=JOINTTYPE'
-
-            if len(type) == 1:
-                type = None
-            else:
-                name = type[0]
-                type = type[1]
-
-            j = {}
-            j['name'] = name
-            j['type'] = type
-            j['compA'] = compA
-            j['compB'] = compB
-            j['pt'] = pt
-            j['dir'] = dir
-
-            joints.append(j)
+    reader = csv.reader(joints_file)
+    for i, row in enumerate(reader):
+        if i == 0:
+            continue
+
+        name = row[0]
+        compA = row[1]
+        compB = row[2]
+        pt = [float(val) for val in row[3:6]]
+        dir = [float(val) for val in row[6:9]]
+
+        type = name.split('=')
+        assert len(
+            type) <= 2, 'Incorrect joint name format. Name of joints should be JOINTNAME=JOINTTYPE'
+
+        if len(type) == 1:
+            type = None
+        else:
+            name = type[0]
+            type = type[1]
+
+        j = {}
+        j['name'] = name
+        j['type'] = type
+        j['compA'] = compA
+        j['compB'] = compB
+        j['pt'] = pt
+        j['dir'] = dir
+
+        joints.append(j)
+
+    return layers_comp, comps_layer, zs, joints
+
+
+def read_component(path, comp, l):
+    # Polys and circles of one component in one layer
+    return read_doc(ezdxf.readfile(os.path.join(
+        path, '{:d}_{}.dxf'.format(l, comp))))
+
+
+def read_doc(doc):
+    # Same as dxf.read_lwpolylines and dxf.read_circles, but from a document
+    # that is only parsed once
+    polys = []
+    circles = []
+    for e in doc.modelspace():
+        if e.dxftype() == 'LWPOLYLINE':
+            line = np.array(list(e.get_points()))
+            line_out = []
+            for ii in range(len(line)):
+                if line[ii, 4] != 0:
+                    line_out.extend(dxf.calc_circle(
+                        line[ii, :2], line[ii + 1, :2], line[ii, 4], 0))
+                else:
+                    line_out.append(line[ii, :2].tolist())
+            polys.append(line_out)
+        elif e.dxftype() == 'CIRCLE':
+            center = e.get_dxf_attrib('center')
+            radius = e.get_dxf_attrib('radius')
+            circles.append((center, radius))
+    return polys, circles
+
+
+def read_dxf_bytes(data):
+    # Same encoding detection as ezdxf.readfile
+    info = dxf_stream_info(io.StringIO(data.decode('utf-8', errors='ignore')))
+    return ezdxf.read(io.StringIO(
+        data.decode(info.encoding, errors='surrogateescape')))
+
+
+def read_bundle(files):
+    # Same as read, but from a dict of file names in the export folder to
+    # their contents in bytes
+    layers_comp, comps_layer, zs, joints = parse_tables(
+        io.StringIO(files['layers.csv'].decode(), newline=''),
+        io.StringIO(files['rev_joints.csv'].decode(), newline=''))
 
-    # Read polys within each layer of each component
     comps_poly = {}
     comps_circle = {}
     for comp in comps_layer:
         comps_poly[comp] = {}
         comps_circle[comp] = {}
         for l in comps_layer[comp]:
-            polys = dxf.read_lwpolylines(os.path.join(
-                path, '{:d}_{}.dxf'.format(l, comp)))
-            circles = dxf.read_circles(
-                os.path.join(
-                    path, '{:d}_{}.dxf'.format(l, comp)))
+            polys, circles = read_doc(read_dxf_bytes(
+                files['{:d}_{}.dxf'.format(l, comp)]))
             comps_poly[comp][l] = polys
             comps_circle[comp][l] = circles
 
+    joint_lines(joints, comps_poly, zs)
+
+    return comps_poly, comps_circle, joints, layers_comp
+
+
+def joint_center_layer(j, zs):
+    # Determine joint center layer
+    for l in range(len(zs.keys()) - 1):
+        if j['pt'][2] < zs[l + 1] and j['pt'][2] > zs[l]:
+            break
+    return l
+
+
+def joint_lines(joints, comps_poly, zs):
     # Construct joints
     for j in joints:
-        # Determine joint center layer
-        for l in range(len(zs.keys()) - 1):
-            if j['pt'][2] < zs[l + 1] and j['pt'][2] > zs[l]:
-                break
+        l = joint_center_layer(j, zs)
 
         # Determine line
         d = 0.01
@@ -125,5 +205,3 @@ def read(path):
 
         j['lines'] = lines_shrunk
         j['layer'] = l
-
-    return comps_poly, comps_circle, joints, layers_comp
@@ -0,0 +1,165 @@
+import numpy as np
+import shapely
+import shapely.geometry as sg
+from foldable_robotics.layer import Layer
+import joint
+
+CUT_THICKNESS = joint.CUT_THICKNESS
+# Edges this close are the same cut. Slits are exactly one cut thick, so
+# this has to stay well below the cut thickness.
+SMALL_DIM = joint.CUT_THICKNESS / 5
+
+
+def segments(paths):
+    # Start and end of every segment and where each path starts
+    starts = []
+    ends = []
+    offsets = [0]
+    for path in paths:
+        coords = np.asarray(path, dtype=float)[:, :2]
+        starts.append(coords[:-1])
+        ends.append(coords[1:])
+        offsets.append(offsets[-1] + len(coords) - 1)
+    if len(starts) == 0:
+        return np.zeros((0, 2)), np.zeros((0, 2)), offsets
+    return np.concatenate(starts), np.concatenate(ends), offsets
+
+
+def covered(starts, ends, tolerance):
+    # Intervals of each segment, as distances along it, that an earlier
+    # segment already cuts. Earlier segments are found with a spatial index
+    # and count when they lie along the segment within the tolerance.
+    lines = shapely.linestrings(
+        np.stack([starts, ends], axis=1).reshape(-1, 2),
+        indices=np.repeat(np.arange(len(starts)), 2))
+    tree = shapely.STRtree(lines)
+    j, i = tree.query(lines, predicate='dwithin', distance=tolerance)
+    earlier = i < j
+    i, j = i[earlier], j[earlier]
+
+    d = ends - starts
+    length = np.linalg.norm(d, axis=1)
+    u = d / np.where(length > 0, length, 1)[:, None]
+
+    # Distance of both ends of i from the line of j and their position on j
+    pa = starts[i] - starts[j]
+    pb = ends[i] - starts[j]
+    cross_a = np.abs(u[j, 0] * pa[:, 1] - u[j, 1] * pa[:, 0])
+    cross_b = np.abs(u[j, 0] * pb[:, 1] - u[j, 1] * pb[:, 0])
+    ta = np.sum(u[j] * pa, axis=1)
+    tb = np.sum(u[j] * pb, axis=1)
+    t0 = np.clip(np.minimum(ta, tb), 0, length[j])
+    t1 = np.clip(np.maximum(ta, tb), 0, length[j])
+
+    # Overlaps shorter than the tolerance are only touching corners
+    along = (cross_a <= tolerance) & (cross_b <= tolerance) & (
+        t1 - t0 > tolerance)
+    cover = [[] for _ in range(len(starts))]
+    for k, t0_k, t1_k in zip(j[along], t0[along], t1[along]):
+        cover[k].append((t0_k, t1_k))
+    return cover, length
+
+
+def kept(cover, length, tolerance):
+    # Complement of the covered intervals, without pieces shorter than the
+    # tolerance
+    pieces = []
+    t = 0
+    for t0, t1 in sorted(cover):
+        if t0 - t > tolerance:
+            pieces.append((t, t0))
+        t = max(t, t1)
+    if length - t > tolerance:
+        pieces.append((t, length))
+    return pieces
+
+
+def dedupe(layers, tolerance=SMALL_DIM):
+    # Cut paths of the layers with every physical edge only once. Layers are
+    # cut in order, so a later edge that lies along an earlier one within
+    # the tolerance is removed. Paths without removed edges are kept as they
+    # are, the others are split where edges were removed.
+    paths = [layer.get_paths() for layer in layers]
+    flat = [path for layer_paths in paths for path in layer_paths]
+    starts, ends, offsets = segments(flat)
+    if len(starts) == 0:
+        return [Layer() for _ in layers], 0
+    cover, length = covered(starts, ends, tolerance)
+
+    removed = 0
+    lines = []
+    for k, path in enumerate(flat):
+        idx = range(offsets[k], offsets[k + 1])
+        if all([len(cover[s]) == 0 for s in idx]):
+            lines.append([sg.LineString(path)])
+            continue
+
+        # Chain the kept pieces of consecutive segments
+        runs = []
+        run = []
+        for s in idx:
+            pieces = kept(cover[s], length[s], tolerance)
+            removed += length[s] - sum([t1 - t0 for t0, t1 in pieces])
+            # A run only continues through the start of a kept segment
+            if len(pieces) == 0 or pieces[0][0] != 0:
+                if len(run) > 1:
+                    runs.append(run)
+                run = []
+            for t0, t1 in pieces:
+                a = tuple(starts[s] + (ends[s] - starts[s]) * t0 / length[s])
+                b = tuple(starts[s] + (ends[s] - starts[s]) * t1 / length[s])
+                if t0 == 0:
+                    a = tuple(starts[s])
+                if t1 == length[s]:
+                    b = tuple(ends[s])
+                if len(run) > 0:
+                    run.append(b)
+                else:
+                    run = [a, b]
+                if t1 != length[s]:
+                    runs.append(run)
+                    run = []
+        if len(run) > 1:
+            runs.append(run)
+
+        # Join the last run to the first when a closed path is split
+        closed = np.allclose(path[0][:2], path[-1][:2])
+        if (closed and len(runs) > 1 and runs[0][0] == runs[-1][-1]):
+            runs[0] = runs.pop()[:-1] + runs[0]
+        lines.append([sg.LineString(run) for run in runs])
+
+    # Regroup the lines by layer
+    layers_lines = []
+    k = 0
+    for layer_paths in paths:
+        layer_lines = []
+        for _ in layer_paths:
+            layer_lines.extend(lines[k])
+            k += 1
+        layers_lines.append(Layer(*layer_lines))
+    return layers_lines, removed
+
+
+def check(count=100):
+    # Regression cases. Slits one cut thick, as the joints and bodies cut,
+    # keep both sides at any angle, and two squares touching along an edge
+    # only cut it once.
+    random = np.random.RandomState(0)
+    for _ in range(count):
+        x, y, angle = random.uniform(0, 100, 3)
+        d = np.array([np.cos(angle), np.sin(angle)])
+        slit = sg.LineString([(x, y), (x, y) + 6 * d]).buffer(
+            CUT_THICKNESS / 2, cap_style=sg.CAP_STYLE.flat,
+            join_style=sg.JOIN_STYLE.mitre)
+        _, removed = dedupe([Layer(slit)])
+        assert removed == 0, 'Slit at {:.3f} rad lost {:.3f} mm'.format(
+            angle, removed)
+
+    _, removed = dedupe([Layer(sg.box(0, 0, 1, 1)), Layer(sg.box(1, 0, 2, 1))])
+    assert np.isclose(removed, 1), 'Shared edge removed {:.3f} mm'.format(
+        removed)
+
+
+if __name__ == '__main__':
+    # python dedupe.py
+    check()
@@ -0,0 +1,188 @@
+import numpy as np
+import shapely
+import shapely.geometry as sg
+import contourpy
+from foldable_robotics.layer import Layer
+from foldable_robotics.laminate import Laminate
+import plan
+
+PIXEL = 0.05  # Size of a pixel in the draft bitmaps
+CUT_THICKNESS = plan.CUT_THICKNESS
+
+
+def distance(d, pixel, thin=False):
+    # Distance in pixels. Cut widths are kept at least one pixel wide, while
+    # smaller tolerances vanish.
+    k = int(round(d / pixel))
+    return max(k, 1) if thin else k
+
+
+def grid(layer, pixel, margin):
+    # Origin, pixel size and shape of a bitmap covering the layer
+    x1, y1, x2, y2 = shapely.total_bounds(
+        np.array(layer.geoms, dtype=object))
+    x0, y0 = x1 - margin, y1 - margin
+    cols = int(np.ceil((x2 - x1 + 2 * margin) / pixel))
+    rows = int(np.ceil((y2 - y1 + 2 * margin) / pixel))
+    return x0, y0, pixel, rows, cols
+
+
+def rasterize(layer, grid):
+    # Fill pixels whose center is inside the layer by counting the winding
+    # of every edge crossing each row of pixel centers
+    x0, y0, pixel, rows, cols = grid
+    starts = []
+    ends = []
+    for g in layer.geoms:
+        if g.geom_type != 'Polygon':
+            continue
+        g = sg.polygon.orient(g)
+        for ring in [g.exterior, *g.interiors]:
+            coords = np.asarray(ring.coords)[:, :2]
+            starts.append(coords[:-1])
+            ends.append(coords[1:])
+    if len(starts) == 0:
+        return np.zeros((rows, cols), dtype=bool)
+
+    # Pixel centers at integer coordinates
+    a = (np.concatenate(starts) - (x0, y0)) / pixel - 0.5
+    b = (np.concatenate(ends) - (x0, y0)) / pixel - 0.5
+    r0 = np.clip(np.ceil(np.minimum(a[:, 1], b[:, 1])), 0, rows).astype(int)
+    r1 = np.clip(np.ceil(np.maximum(a[:, 1], b[:, 1])), 0, rows).astype(int)
+    n = r1 - r0
+
+    # One crossing per edge and row
+    edge = np.repeat(np.arange(len(n)), n)
+    r = r0[edge] + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    t = (r - a[edge, 1]) / (b[edge, 1] - a[edge, 1])
+    u = a[edge, 0] + t * (b[edge, 0] - a[edge, 0])
+    c = np.clip(np.ceil(u), 0, cols).astype(int)
+    winding = np.sign(b[edge, 1] - a[edge, 1])
+
+    toggles = np.bincount(
+        r * (cols + 1) + c, weights=winding, minlength=rows * (cols + 1))
+    toggles = toggles.reshape(rows, cols + 1)
+    return np.cumsum(toggles, axis=1)[:, :cols] != 0
+
+
+def rasterize_laminate(laminate, grid):
+    return np.array([rasterize(layer, grid) for layer in laminate])
+
+
+def dilate(img, k):
+    # Binary dilation by a disk of radius k pixels over the last two axes,
+    # as the union of shifted row-wise dilations
+    if k <= 0:
+        return img
+    rows, cols = img.shape[-2:]
+    pad = [(0, 0)] * (img.ndim - 1) + [(k + 1, k)]
+    cs = np.cumsum(np.pad(img, pad), axis=-1, dtype=np.int32)
+
+    rows_dilated = {}
+    out = np.zeros_like(img)
+    for dy in range(-k, k + 1):
+        w = int(np.sqrt(k**2 - dy**2))
+        if w not in rows_dilated:
+            # Any pixel within w of each pixel in its row
+            rows_dilated[w] = (cs[..., k + 1 + w:k + 1 + w + cols] >
+                               cs[..., k - w:k - w + cols])
+        h = rows_dilated[w]
+        if dy >= 0:
+            out[..., dy:, :] |= h[..., :rows - dy, :]
+        else:
+            out[..., :dy, :] |= h[..., -dy:, :]
+    return out
+
+
+def vectorize(img, grid):
+    # Outlines of the filled pixels, simplified to about a pixel
+    x0, y0, pixel, rows, cols = grid
+    z = np.pad(img, 1).astype(float)
+    x = x0 + (np.arange(cols + 2) - 0.5) * pixel
+    y = y0 + (np.arange(rows + 2) - 0.5) * pixel
+    generator = contourpy.contour_generator(
+        x, y, z, fill_type=contourpy.FillType.OuterOffset)
+    points, offsets = generator.filled(0.5, 1.5)
+
+    polys = []
+    for pts, offs in zip(points, offsets):
+        rings = [pts[i:j] for i, j in zip(offs[:-1], offs[1:])]
+        polys.append(sg.Polygon(rings[0], rings[1:]))
+    polys = shapely.simplify(
+        np.array(polys, dtype=object), pixel, preserve_topology=True)
+    return Layer(*[p for p in polys if not p.is_empty])
+
+
+def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1,
+         pixel=PIXEL):
+    # Approximation of plan.cuts on bitmaps. Distances are rounded to whole
+    # pixels and tolerances below a pixel are dropped.
+    assert clearance > 0
+    num_layers = len(device)
+
+    # The frame only depends on the bounding box of the device
+    device_geoms = [g for layer in device for g in layer.geoms]
+    device_bb = Layer(sg.box(*shapely.total_bounds(
+        np.array(device_geoms, dtype=object))))
+    holes, lines, sheet, release_cut_label = plan.frame(
+        device_bb, num_layers, jig_diameter, jig_hole_spacing)
+
+    c = distance(clearance, pixel)
+    g = grid(sheet, pixel, (c + 2) * pixel)
+    device = rasterize_laminate(device, g)
+    sheet = rasterize(sheet, g)
+    holes = rasterize_laminate(holes, g)
+    lines = rasterize_laminate(lines, g)
+    release_cut_label = rasterize_laminate(release_cut_label, g)
+
+    # Keepout region that laser should never cut
+    keepout = device.any(axis=0)
+
+    # not_web_material(device, up)[i] is the union of device[n:] (up) or
+    # device[:n + 1] (down) with n from plan.not_web_index
+    above = np.logical_or.accumulate(device[::-1], axis=0)[::-1]
+    below = np.logical_or.accumulate(device, axis=0)
+    not_web_up = above[[
+        plan.not_web_index(i, num_layers, True) for i in range(num_layers)]]
+    not_web_down = below[[
+        plan.not_web_index(i, num_layers, False) for i in range(num_layers)]]
+
+    # Identify material for web
+    all_scrap = sheet & ~device
+    web_material_up = all_scrap & ~dilate(not_web_up, c)
+    web_material_down = all_scrap & ~dilate(not_web_down, c)
+    web = (web_material_up | web_material_down) & ~holes & ~lines
+
+    # Support is outside of the keepout, so the not cuttable region inside
+    # it never removes any
+    support = dilate(keepout, c) & ~keepout
+    layers_cut = web | device | support
+
+    # Material cut reaches half a cut into the scrap, so it is dilated by
+    # two half cuts of at least one pixel each
+    half_cut = distance(CUT_THICKNESS / 2, pixel, True)
+    release_cut_scrap = sheet & ~keepout & ~release_cut_label
+    device_released = layers_cut & ~dilate(release_cut_scrap, half_cut)
+    material_cut = dilate(device_released, 2 * half_cut) & release_cut_scrap
+
+    # Same selection as plan.special_cuts
+    release_cut_layers_mpg = []
+    for j in range(num_layers):
+        material_cut_n = material_cut[j].copy()
+        for i in range(num_layers):
+            if j != 2 or i != j:
+                material_cut_n &= ~material_cut[i]
+        material_cut_n = vectorize(material_cut_n, g)
+        material_cut_n.geoms = [
+            p for p in material_cut_n.geoms
+            if p.area > (CUT_THICKNESS * 1.1)**2]
+        material_cut_n = material_cut_n.dilate(0.8)
+        release_cut_layers_mpg.append(
+            Layer(sg.MultiPolygon(material_cut_n.geoms)))
+
+    release_cut, release_cut_layers = plan.release_cuts(
+        vectorize(release_cut_scrap[0], g),
+        Laminate(*release_cut_layers_mpg))
+    layers_cut = Laminate(*[vectorize(l, g) for l in layers_cut])
+
+    return layers_cut, release_cut, release_cut_layers
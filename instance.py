@@ -0,0 +1,71 @@
+import numpy as np
+import shapely.affinity as sa
+import shapely.geometry as sg
+
+DECIMALS = 6  # Coordinates closer than this are considered identical
+
+
+def ring_key(ring):
+    # Rounded ring independent of its orientation and starting vertex
+    ring = np.round(ring, DECIMALS) + 0.0  # Avoid -0.0
+    x, y = ring[:, 0], ring[:, 1]
+    if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0:
+        ring = ring[::-1]
+    start = min(range(len(ring)), key=lambda i: tuple(ring[i]))
+    return tuple(map(tuple, np.roll(ring, -start, axis=0)))
+
+
+def canonical(polys):
+    # Canonical form of a set of polygons up to rotation and translation.
+    # Returns a hashable key, the polygons in the canonical frame and the
+    # angle and center that place them back.
+    rings = []
+    for p in polys:
+        ring = np.array(p, dtype=float)[:, :2]
+        if len(ring) > 1 and np.all(ring[0] == ring[-1]):
+            ring = ring[:-1]
+        rings.append(ring)
+    if len(rings) == 0 or sum([len(r) for r in rings]) == 0:
+        return (), [], (0, (0, 0))
+
+    pts = np.concatenate(rings)
+    center = pts.mean(axis=0)
+    d = np.linalg.norm(pts - center, axis=1)
+
+    # Align each of the farthest vertices with x axis and keep the smallest
+    best = None
+    angles = np.arctan2(*(pts - center)[d > d.max() - 10**-DECIMALS].T[::-1])
+    _, idx = np.unique(np.round(angles, DECIMALS), return_index=True)
+    for angle in angles[idx]:
+        c, s = np.cos(-angle), np.sin(-angle)
+        rot = np.array([[c, -s], [s, c]])
+        local = [(r - center) @ rot.T for r in rings]
+        key = tuple(sorted([ring_key(r) for r in local]))
+        if best is None or key < best[0]:
+            best = (key, local, angle)
+
+    key, local, angle = best
+    return key, local, (angle, tuple(center))
+
+
+def place(polys, cache, build):
+    # Build geometry of the polygons once per unique shape in cache and place
+    # it. build takes shapely polygons and returns geometries or lists of
+    # geometries.
+    key, local, (angle, center) = canonical(polys)
+    # Threads sharing the cache may build the same shape twice, but never
+    # see a partial entry
+    built = cache.get(key)
+    if built is None:
+        built = build([sg.Polygon(r) for r in local])
+        cache[key] = built
+
+    c, s = np.cos(angle), np.sin(angle)
+    matrix = [c, -s, s, c, center[0], center[1]]
+
+    def transform(item):
+        if isinstance(item, list):
+            return [transform(i) for i in item]
+        return sa.affine_transform(item, matrix)
+
+    return tuple([transform(item) for item in built])
@@ -4,7 +4,6 @@ import shapely.affinity as sa
 import foldable_robotics.dxf as dxf
 from foldable_robotics.layer import Layer
 from foldable_robotics.laminate import Laminate
-import matplotlib.pyplot as plt
 
 W_DEFAULT = 0.6
 CUT_THICKNESS = 0.01
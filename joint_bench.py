@@ -0,0 +1,242 @@
+import collections
+import contextlib
+import csv
+import itertools
+import sys
+import time
+import numpy as np
+import shapely
+import shapely.geometry as sg
+import shapely.geometry.base as sb
+from foldable_robotics.layer import Layer
+from foldable_robotics.laminate import Laminate
+import joint
+
+LENGTHS = [6, 10, 20, 50]
+# Style parameters swept for each generator in joint.DICTS
+PARAMS = {
+    'plain5': {'w': [0.4, 0.6, 1.0]},
+    'stamp5': {'w': [0.4, 0.6, 1.0]},
+    'bend5': {'j': [0.4, 0.6, 1.0], 't': [0.3, 0.4]},
+    'plain1': {'w': [0.4, 0.6, 1.0]},
+    'dashed1': {'w': [0.4, 0.6, 1.0], 'style': [(1, 1), (0.5, 0.5), (2, 1)]},
+}
+REPEAT = 20
+BINARY_OPS = ['union', 'intersection', 'difference', 'symmetric_difference']
+
+
+def stamp5(line, w=joint.W_DEFAULT):
+    # Same as joint.stamp5 with the teeth of each side buffered at once
+    l3 = joint.bbox(line, w)
+
+    line = np.array(line).reshape((2, 2))
+
+    dir = line[1, :] - line[0, :]
+    l = np.linalg.norm(dir)
+    dir = dir / l
+    ang = np.arctan2(dir[1], dir[0]) + np.pi / 2
+
+    r = 0.2  # flexure joint width
+    d = 0.2  # clearance between tooth
+    lt = (l - d * 2) / 3  # tooth length
+    wt = (w - r) / 2  # tooth width
+
+    dx = (wt / 2 + r / 2) * np.cos(ang)
+    dy = (wt / 2 + r / 2) * np.sin(ang)
+
+    def teeth(side):
+        line_left = line + side * np.array([dx, dy])
+        line_right = line - side * np.array([dx, dy])
+        ts = sg.MultiLineString([
+            [line_left[0, :] + dir * wt / 2,
+             line_left[0, :] + dir * (wt / 2 + lt - wt)],
+            [line_right[0, :] + dir * (lt + d + wt / 2),
+             line_right[0, :] + dir * (lt + d + wt / 2 + lt - wt)],
+            [line_left[1, :] - dir * wt / 2,
+             line_left[1, :] - dir * (wt / 2 + lt - wt)]])
+        return Layer(ts.buffer(wt / 2, cap_style=sg.CAP_STYLE.square))
+
+    l1 = teeth(1) & l3
+    l5 = teeth(-1) & l3
+
+    joint_laminate = Laminate(l1, l1, l3, l5, l5)
+    joint_laminate_inv = l3.to_laminate(5) - joint_laminate
+    return joint_laminate, joint_laminate_inv
+
+
+def bend5(line, w=6 + 0.5 * 2 + 0.4, ds=0.5, t=0.4, j=joint.W_DEFAULT,
+          pad=2.5):
+    # Same as joint.bend5 with the ribs and holes added in one union each
+    s = w - ds * 2 - t
+    line = np.array(line).reshape((2, 2))
+    dir = line[1, :] - line[0, :]
+    l = np.linalg.norm(dir)
+    dir = dir / l
+    ang = np.arctan2(dir[1], dir[0])
+    center = (line[1, :] + line[0, :]) / 2
+
+    cs = np.array([center, center + (l / 2 - pad) * dir,
+                   center - (l / 2 - pad) * dir])
+    rots = np.array([ang + np.pi / 2, ang - np.pi / 2])
+    normals = np.stack([np.cos(rots), np.sin(rots)], axis=1)
+
+    def spokes(length):
+        p1 = np.repeat(cs, len(rots), axis=0)
+        p2 = p1 + length * np.tile(normals, (len(cs), 1))
+        lines = sg.MultiLineString(list(np.stack([p1, p2], axis=1)))
+        return lines.buffer(t / 2, cap_style=sg.CAP_STYLE.square)
+
+    hinge = joint.bbox(line, j)
+    bpg = Layer(shapely.union_all([hinge.geoms[0], spokes(s / 2 + ds)]))
+    flex_layer = Layer(shapely.union_all([hinge.geoms[0], spokes(s / 2 - t)]))
+    other_layer = flex_layer ^ hinge
+
+    joint_laminate = Laminate(
+        other_layer,
+        other_layer,
+        flex_layer,
+        other_layer,
+        other_layer)
+    joint_laminate_inv = bpg.to_laminate(5) - joint_laminate
+
+    return joint_laminate, joint_laminate_inv
+
+
+def dashed1(line, w=joint.W_DEFAULT, style=(1, 1), pad=2):
+    # Same as joint.dashed1 with every dash buffered at once
+    flex_layer = joint.bbox(line, w)
+
+    line = np.array(line).reshape((2, 2))
+    center = np.average(line, axis=0)
+    dir = line[1, :] - line[0, :]
+    l = np.linalg.norm(dir)
+    dir = dir / l
+
+    ls = style[0] + style[1]
+    num_pair = int((l - pad * 2) / ls) - 0.5
+    pad_actual = (l - num_pair * ls) / 2
+
+    t = joint.CUT_THICKNESS
+    p1 = center - dir * (l / 2 - pad_actual - t / 2)
+    starts = p1 + np.arange(int(num_pair) + 1)[:, None] * ls * dir
+    dashes = sg.MultiLineString(
+        list(np.stack([starts, starts + dir * (style[0] - t)], axis=1)))
+    cuts = Layer(dashes.buffer(t / 2, cap_style=sg.CAP_STYLE.square))
+
+    joint_laminate = Laminate(flex_layer - cuts)
+    joint_laminate_inv = flex_layer.to_laminate(1) - joint_laminate
+    return joint_laminate, joint_laminate_inv
+
+
+# Batched constructions, the other generators have no repeated pattern
+BATCHED = {
+    'stamp5': stamp5,
+    'bend5': bend5,
+    'dashed1': dashed1,
+}
+
+
+@contextlib.contextmanager
+def count_ops():
+    # Count boolean operations on shapely geometries, including the unions
+    # foldable_robotics runs when building and combining layers
+    counts = collections.Counter()
+    originals = {name: getattr(sb.BaseGeometry, name) for name in BINARY_OPS}
+    union_all = shapely.union_all
+
+    def counted(name, function):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    for name, function in originals.items():
+        setattr(sb.BaseGeometry, name, counted('binary', function))
+    shapely.union_all = counted('union_all', union_all)
+    try:
+        yield counts
+    finally:
+        for name, function in originals.items():
+            setattr(sb.BaseGeometry, name, function)
+        shapely.union_all = union_all
+
+
+def geoms(laminates):
+    return np.array([g for laminate in laminates for layer in laminate
+                     for g in layer.geoms], dtype=object)
+
+
+def areas(laminates):
+    return np.array([sum([g.area for g in layer.geoms])
+                     for laminate in laminates for layer in laminate])
+
+
+def measure(jf, line, params, repeat=REPEAT):
+    # Best time per call, output vertices and boolean operations per call
+    with count_ops() as counts:
+        result = jf(line, **params)
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        jf(line, **params)
+        best = min(best, time.perf_counter() - start)
+    vertices = int(shapely.get_num_coordinates(geoms(result)).sum())
+    return best, vertices, counts['binary'], counts['union_all'], result
+
+
+def points(grid):
+    keys = list(grid.keys())
+    for values in itertools.product(*[grid[k] for k in keys]):
+        yield dict(zip(keys, values))
+
+
+def bench(joint_dicts=joint.DICTS, lengths=LENGTHS, params=PARAMS,
+          repeat=REPEAT):
+    rows = []
+    for name, jf in joint_dicts.items():
+        for l, p in itertools.product(lengths, points(params.get(name, {}))):
+            line = [(0.0, 0.0), (float(l), 0.0)]
+            time_, vertices, binary, unions, result = measure(
+                jf, line, p, repeat)
+            row = [name, l, str(p), time_ * 1000, vertices, binary, unions]
+
+            if name in BATCHED:
+                time_b, vertices_b, binary_b, unions_b, result_b = measure(
+                    BATCHED[name], line, p, repeat)
+                error = np.abs(areas(result) - areas(result_b)).max()
+                row += [time_b * 1000, vertices_b, binary_b, unions_b, error]
+            else:
+                row += [None] * 5
+            rows.append(row)
+    return rows
+
+
+HEADER = ['joint', 'length', 'params', 'time_ms', 'vertices', 'binary_ops',
+          'union_alls', 'batched_time_ms', 'batched_vertices',
+          'batched_binary_ops', 'batched_union_alls', 'area_error']
+
+
+def show(rows):
+    print('{:<8s} {:>6s} {:<34s} {:>8s} {:>8s} {:>6s} {:>6s} {:>8s} {:>8s} '
+          '{:>6s} {:>6s} {:>9s}'.format(
+              'joint', 'length', 'params', 'time[ms]', 'vertices', 'binary',
+              'unions', 'batched', 'vertices', 'binary', 'unions',
+              'area err'))
+    for row in rows:
+        print('{:<8s} {:>6g} {:<34s} {:>8.3f} {:>8d} {:>6d} {:>6d}'.format(
+            *row[:7]), end='')
+        if row[7] is None:
+            print()
+        else:
+            print(' {:>8.3f} {:>8d} {:>6d} {:>6d} {:>9.1e}'.format(*row[7:]))
+
+
+if __name__ == '__main__':
+    # python joint_bench.py [REPORT.csv]
+    rows = bench()
+    show(rows)
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
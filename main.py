@@ -1,23 +1,71 @@
+import os
 import data
 import plan
-import matplotlib.pyplot as plt
-import os
+import report
 import sys
 
-if __name__ == '__main__':
-    path = sys.argv[1]
-    plot = '-p' in sys.argv
-    twin = '-t' in sys.argv
 
-    polys, circles, joints, layers = data.read(path)
+def run(path, plot=False, twin=False, precise=False, png=False,
+        instances=None, pipelined=False, drafting=False, mirrored=False):
+    # Snap to the manufacturing grid instead of repairing every polygon
+    grid_size = plan.GRID_SIZE if precise else None
 
-    device, joints_cut, bodies_cut = plan.device(
-        polys, circles, joints, layers)
+    if pipelined:
+        # Build each layer while the files of later layers are still read
+        import pipeline
+        device, joints_cut, bodies_cut, layers = pipeline.device(
+            path, grid_size=grid_size, instances=instances)
+    else:
+        polys, circles, joints, layers = data.read(path)
+        device, joints_cut, bodies_cut = plan.device(
+            polys, circles, joints, layers, grid_size=grid_size,
+            instances=instances)
 
-    if twin:
-        device = plan.twin(device)
+    if instances is not None:
+        num_comps = sum([len(layers[l]) for l in layers])
+        print('Built {:d} unique shapes for {:d} component layers'.format(
+            len(instances), num_comps))
 
     # Use clearance to remove thin web and separate web from device
-    layers_cut, release_cut, release_cut_layers = plan.cuts(device)
+    name = None
+    if drafting:
+        # Approximate cuts on bitmaps, saved apart from the exact cut files
+        import draft
+        if twin:
+            device = plan.twin(device)
+        layers_cut, release_cut, release_cut_layers = draft.cuts(device)
+        name = os.path.basename(os.path.normpath(path)) + '_draft'
+    elif twin and mirrored:
+        # Plan one instance and mirror it
+        layers_cut, release_cut, release_cut_layers = plan.twin_cuts(device)
+    elif twin:
+        layers_cut, release_cut, release_cut_layers = plan.cuts(
+            plan.twin(device))
+    else:
+        layers_cut, release_cut, release_cut_layers = plan.cuts(device)
+
+    rows = plan.export(path, layers_cut, release_cut, release_cut_layers,
+                       plot=plot, png=png, name=name)
+    report.show(rows)
+
+
+if __name__ == '__main__':
+    path = sys.argv[1]
+    plot = '-p' in sys.argv
+    twin = '-t' in sys.argv
+    precise = '-f' in sys.argv
+    png = '--png' in sys.argv
+    # Unique shapes are kept between runs in watch mode
+    instances = {} if '-i' in sys.argv else None
+    pipelined = '-l' in sys.argv
+    drafting = '-d' in sys.argv
+    mirrored = '-m' in sys.argv
 
-    plan.export(path, layers_cut, release_cut, release_cut_layers, plot=plot)
+    if '--watch' in sys.argv:
+        import watch
+        watch.watch(path, lambda: run(
+            path, plot, twin, precise, png, instances, pipelined, drafting,
+            mirrored))
+    else:
+        run(path, plot, twin, precise, png, instances, pipelined, drafting,
+            mirrored)
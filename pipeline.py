@@ -0,0 +1,78 @@
+import concurrent.futures
+import sys
+import time
+from foldable_robotics.laminate import Laminate
+import data
+import joint
+import plan
+
+
+def read_layer(path, comps, l):
+    # Files of every component in layer l
+    return {comp: data.read_component(path, comp, l) for comp in comps}
+
+
+def device(path, joint_dicts=joint.DICTS, grid_size=None, instances=None,
+           workers=None):
+    # Same as data.read followed by plan.device, but the dxf files are read
+    # in worker processes and each layer is built as soon as its files
+    # are parsed. Parsing is pure Python, so processes are used to overlap
+    # it with the geometry work. Joints only need the layers they sit on,
+    # so they are added once every layer has been built.
+    layers_comp, comps_layer, zs, joints = data.read_tables(path)
+
+    comps_poly = {comp: {} for comp in comps_layer}
+    comps_circle = {comp: {} for comp in comps_layer}
+    bodies = {}
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # Submitted in the order layers are consumed
+        loads = {l: executor.submit(read_layer, path, layers_comp[l], l)
+                 for l in layers_comp}
+        for l in layers_comp:
+            for comp, (polys, circles) in loads.pop(l).result().items():
+                comps_poly[comp][l] = polys
+                comps_circle[comp][l] = circles
+            bodies[l] = plan.layer_bodies(
+                comps_poly, comps_circle, layers_comp[l], l, grid_size,
+                instances)
+
+    data.joint_lines(joints, comps_poly, zs)
+    joints_lam = plan.joint_laminates(joints, layers_comp, joint_dicts)
+
+    device = []
+    joints_cut = []
+    bodies_cut = []
+    for l in layers_comp:
+        layer, joints_cut_l, bodies_cut_l = plan.layer_joints(
+            joints_lam, l, *bodies.pop(l))
+        device.append(layer)
+        joints_cut.append(joints_cut_l)
+        bodies_cut.append(bodies_cut_l)
+
+    return (Laminate(*device), Laminate(*joints_cut), Laminate(*bodies_cut),
+            layers_comp)
+
+
+def compare(path, repeat=3):
+    # End-to-end latency of reading and building the device, sequential
+    # against pipelined. The best of each is reported.
+    sequential = []
+    pipelined = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        polys, circles, joints, layers = data.read(path)
+        plan.device(polys, circles, joints, layers)
+        sequential.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        device(path)
+        pipelined.append(time.perf_counter() - start)
+
+    print('Sequential: {:.3f} s'.format(min(sequential)))
+    print('Pipelined: {:.3f} s'.format(min(pipelined)))
+    return min(sequential), min(pipelined)
+
+
+if __name__ == '__main__':
+    # python pipeline.py PATH
+    compare(sys.argv[1])
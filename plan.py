@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import numpy as np
+import shapely
 import shapely.geometry as sg
 import shapely.affinity as sa
+import shapely.ops as so
 import shapely.errors as se
 import foldable_robotics.dxf as dxf
 from foldable_robotics.layer import Layer
@@ -10,63 +11,66 @@ import foldable_robotics.manufacturing as mfg
 import os
 import sys
 import ezdxf
+import dedupe
+import instance
 import joint
+import report
 
 CUT_THICKNESS = joint.CUT_THICKNESS
 SMALL_DIM = joint.CUT_THICKNESS / 5
 CIRCLE_RESOLUTION = 5
-
-
-def device(comps_poly, comps_circle, joints,
-           layers_comp, joint_dicts=joint.DICTS):
-    # Convert circles to polygons
-    for l in layers_comp.keys():
-        for comp in layers_comp[l]:
-            circles = []
-            for circle in comps_circle[comp][l]:
-                # HACK: Flip circle around y, bug may be related to the
-                # extrusion direction(0,0,-1)
-                center = (-list(circle[0])[0], list(circle[0])[1])
-                p = sg.Point(center).buffer(
-                    circle[1], resolution=CIRCLE_RESOLUTION)
-                circles.append(list(p.exterior.coords))
-            comps_poly[comp][l] = comps_poly[comp][l] + circles
-
-    # Construct device
-    device = []
-    for l in layers_comp.keys():
-        layer = sg.Polygon()
-        for comp in layers_comp[l]:
-            ps = [sg.Polygon(p) for p in comps_poly[comp][l]]
-
-            # Count how many times each polygon is within another polygon
-            within_cnts = [
-                np.sum([
-                    p.buffer(
-                        CUT_THICKNESS / 2,
-                        join_style=sg.JOIN_STYLE.mitre).within(pp)
-                    for pp in ps])
-                for p in ps]
-            idx_order = np.argsort(within_cnts)
-
-            for i in idx_order:
-                p = ps[i]
-                cnts = within_cnts[i]
-                # NOTE: Some polygon union may fail.
-                # Dilate and erode fix the problem but not sure why
-                if cnts % 2 != 0:
-                    # An odd counts (mostly 1) means remove
-                    layer -= sg.Polygon(p).buffer(SMALL_DIM).buffer(-SMALL_DIM)
-                else:
-                    # An even counts (mostly 0) means add
-                    layer |= sg.Polygon(p).buffer(SMALL_DIM).buffer(-SMALL_DIM)
-        # Merge touching bodies
-        layer = Layer(layer)
-        layer = mfg.cleanup(layer, SMALL_DIM)
-        device.append(layer)
-
-    device = Laminate(*device)
-
+# Special cuts are grown by this much so all-the-way cuts won't affect them
+SPECIAL_MARGIN = 0.8
+# Manufacturing grid for the fixed precision mode
+GRID_SIZE = CUT_THICKNESS / 10
+
+
+def circle_polys(circles):
+    polys = []
+    for circle in circles:
+        # HACK: Flip circle around y, bug may be related to the
+        # extrusion direction(0,0,-1)
+        center = (-list(circle[0])[0], list(circle[0])[1])
+        p = sg.Point(center).buffer(
+            circle[1], resolution=CIRCLE_RESOLUTION)
+        polys.append(list(p.exterior.coords))
+    return polys
+
+
+def snap_polygons(ps, grid_size):
+    # Repair all polygons in one batched pass and snap them to the grid
+    assert hasattr(shapely, 'set_precision'), \
+        'Fixed precision mode requires shapely 2.0 or newer'
+    ps = shapely.make_valid(np.array(ps, dtype=object))
+    ps = shapely.set_precision(ps, grid_size)
+    # Drop lines and points left over from collapsed parts
+    return [
+        p if p.geom_type in ['Polygon', 'MultiPolygon'] else
+        shapely.union_all([
+            g for g in p.geoms
+            if g.geom_type in ['Polygon', 'MultiPolygon']])
+        for p in ps]
+
+
+def union(a, b, grid_size=None):
+    if grid_size is None:
+        return a | b
+    return shapely.union(a, b, grid_size=grid_size)
+
+
+def difference(a, b, grid_size=None):
+    if grid_size is None:
+        return a - b
+    return shapely.difference(a, b, grid_size=grid_size)
+
+
+def union_all(geoms, grid_size=None):
+    if grid_size is None:
+        return so.unary_union(geoms)
+    return shapely.union_all(geoms, grid_size=grid_size)
+
+
+def joint_laminates(joints, layers_comp, joint_dicts=joint.DICTS):
     def joint_fun(j):
         if j['type'] in joint_dicts:
             return joint_dicts[j['type']]
@@ -80,83 +84,176 @@ def device(comps_poly, comps_circle, joints,
                 # If type not matched, used the first one in dict
                 return joint_dicts[list(joint_dicts.keys())[0]]
 
-    # Cut for forming joints in laminate
-    joints_cut = Laminate(*[Layer()] * len(device))
+    # Mask and cut laminates of every joint line with their first layer
+    laminates = []
     for j in joints:
         for line in j['lines']:
             jf = joint_fun(j)
-            joint_laminate = jf(line)[1]
-            start_layer = j['layer'] - int(len(joint_laminate) / 2)
-            layers = []
-            for i in range(len(device)):
-                if i < start_layer:
-                    layers.append(Layer())
-                else:
-                    if i - start_layer < len(joint_laminate):
-                        layers.append(joint_laminate[i - start_layer])
-                    else:
-                        layers.append(Layer())
-            laminate = Laminate(*layers)
-            joints_cut |= laminate
-    joints_cut = mfg.cleanup(joints_cut, SMALL_DIM)
+            joint_mask, joint_cut = jf(line)
+            start_layer = j['layer'] - int(len(joint_mask) / 2)
+            laminates.append((start_layer, joint_mask, joint_cut))
+    return laminates
+
+
+def joint_layer(joints_lam, l, cut):
+    layer = Layer()
+    for start_layer, joint_mask, joint_cut in joints_lam:
+        joint_laminate = joint_cut if cut else joint_mask
+        if 0 <= l - start_layer < len(joint_laminate):
+            layer |= joint_laminate[l - start_layer]
+    return layer
+
+
+def component(ps, grid_size=None):
+    # Solid of one component in a layer, with its polygons buffered outward
+    # and the cuts along their boundaries for the body cut
+    raw = ps
+    if grid_size is not None:
+        snapped = snap_polygons(ps, grid_size)
+        # Polygons smaller than the grid collapse, drop them together with
+        # their boundaries
+        raw = [r for r, p in zip(ps, snapped) if not p.is_empty]
+        ps = [p for p in snapped if not p.is_empty]
+    outer = [
+        p.buffer(CUT_THICKNESS / 2, join_style=sg.JOIN_STYLE.mitre)
+        for p in ps]
+
+    # Count how many times each polygon is within another polygon
+    within_cnts = [np.sum([o.within(pp) for pp in ps]) for o in outer]
+    idx_order = np.argsort(within_cnts)
+
+    solid = sg.Polygon()
+    for i in idx_order:
+        p = ps[i]
+        cnts = within_cnts[i]
+        if grid_size is None:
+            # NOTE: Some polygon union may fail.
+            # Dilate and erode fix the problem but not sure why
+            p = p.buffer(SMALL_DIM).buffer(-SMALL_DIM)
+        if cnts % 2 != 0:
+            # An odd counts (mostly 1) means remove
+            solid = difference(solid, p, grid_size)
+        else:
+            # An even counts (mostly 0) means add
+            solid = union(solid, p, grid_size)
+
+    # Buffer the boundaries before snapping, a mitred buffer of a snapped
+    # ring that is not axis aligned sometimes comes back filled
+    boundaries = [
+        p.boundary.buffer(CUT_THICKNESS / 2, join_style=sg.JOIN_STYLE.mitre)
+        for p in raw]
+    if grid_size is not None:
+        boundaries = list(shapely.set_precision(
+            np.array(boundaries, dtype=object), grid_size))
+        for r, b in zip(raw, boundaries):
+            # A cut is a band along the boundary, plus the mitred corners
+            assert b.area <= CUT_THICKNESS * (
+                r.length +
+                20 * CUT_THICKNESS * shapely.get_num_coordinates(r)), \
+                'Body cut of a component is not a band along its boundary'
+    return solid, ps, outer, boundaries
+
+
+def layer_bodies(comps_poly, comps_circle, comps, l, grid_size=None,
+                 instances=None):
+    # Layer l of the device and the cut separating its bodies, before any
+    # joint is added. Only the files of layer l are needed.
+    comps_l = []
+    for comp in comps:
+        # Convert circles to polygons
+        polys = comps_poly[comp][l] + circle_polys(comps_circle[comp][l])
+        if instances is None:
+            comps_l.append(
+                component([sg.Polygon(p) for p in polys], grid_size))
+        else:
+            # Shapes are built in their own frame, where the grid does not
+            # line up with the world, so they are only snapped by the unions
+            # of the layer and of the cut
+            comps_l.append(instance.place(polys, instances, component))
+
+    # Construct device layer
+    layer = union_all([solid for solid, _, _, _ in comps_l], grid_size)
+    # Merge touching bodies
+    layer = Layer(layer)
+    layer = mfg.cleanup(layer, SMALL_DIM)
 
     # Cut to separate all bodies
-    bodies_cut = []
-    for l in layers_comp:
-        cut = sg.Polygon()
-        for comp in layers_comp[l]:
-            for p in comps_poly[comp][l]:
-                poly = sg.Polygon(p)
-                # Buffer outward a little to make sure that the polygon is
-                # really "inside".
-                is_inner = any([poly.buffer(
-                    CUT_THICKNESS / 2,
-                    join_style=sg.JOIN_STYLE.mitre).within(g)
-                    for g in device.layers[l].geoms])
-                if is_inner:
-                    # NOTE: Remove inner polygons completely. This should be
-                    # desirable most of the time.
-                    cut |= poly
-                else:
-                    cut |= poly.boundary.buffer(
-                        CUT_THICKNESS / 2, join_style=sg.JOIN_STYLE.mitre)
-        cut = Layer(cut)
-        bodies_cut.append(cut)
-    bodies_cut = Laminate(*bodies_cut)
+    cut = []
+    for solid, ps, outer, boundaries in comps_l:
+        for poly, poly_outer, boundary in zip(ps, outer, boundaries):
+            # Buffer outward a little to make sure that the polygon is
+            # really "inside".
+            is_inner = any([poly_outer.within(g) for g in layer.geoms])
+            if is_inner:
+                # NOTE: Remove inner polygons completely. This should be
+                # desirable most of the time.
+                cut.append(poly)
+            else:
+                cut.append(boundary)
+    bodies_cut = Layer(union_all(cut, grid_size))
+    return layer, bodies_cut
+
+
+def layer_joints(joints_lam, l, layer, bodies_cut):
+    # Cut for forming joints in laminate
+    joints_cut = joint_layer(joints_lam, l, True)
+    joints_cut = mfg.cleanup(joints_cut, SMALL_DIM)
 
     # Mask to avoid cutting joints
-    joints_mask = Laminate(*[Layer()] * len(device))
-    for j in joints:
-        for line in j['lines']:
-            jf = joint_fun(j)
-            joint_laminate = jf(line)[0]
-            start_layer = j['layer'] - int(len(joint_laminate) / 2)
-            layers = []
-            for i in range(len(device)):
-                if i < start_layer:
-                    layers.append(Layer())
-                else:
-                    if i - start_layer < len(joint_laminate):
-                        layers.append(joint_laminate[i - start_layer])
-                    else:
-                        layers.append(Layer())
-            laminate = Laminate(*layers)
-            joints_mask |= laminate
+    joints_mask = joint_layer(joints_lam, l, False)
 
     bodies_cut = bodies_cut - joints_mask
-    device = device - joints_cut - bodies_cut
+    layer = layer - joints_cut - bodies_cut
+    return layer, joints_cut, bodies_cut
+
+
+def device_layers(comps_poly, comps_circle, joints,
+                  layers_comp, joint_dicts=joint.DICTS, grid_size=None,
+                  instances=None):
+    # Build the device one layer at a time. Everything except the returned
+    # layers is released before moving on to the next layer.
+    # With grid_size, polygons are snapped to the grid once and boolean
+    # operations run at that precision instead of repairing each polygon.
+    # With an instances dict, components are built once per unique shape
+    # and placed, and the dict keeps the unique shapes between calls.
+    joints_lam = joint_laminates(joints, layers_comp, joint_dicts)
+
+    for l in layers_comp.keys():
+        layer, bodies_cut = layer_bodies(
+            comps_poly, comps_circle, layers_comp[l], l, grid_size, instances)
+        yield layer_joints(joints_lam, l, layer, bodies_cut)
+
+
+def device(comps_poly, comps_circle, joints,
+           layers_comp, joint_dicts=joint.DICTS, grid_size=None,
+           instances=None):
+    device = []
+    joints_cut = []
+    bodies_cut = []
+    for layer, joints_cut_l, bodies_cut_l in device_layers(
+            comps_poly, comps_circle, joints, layers_comp, joint_dicts,
+            grid_size, instances):
+        device.append(layer)
+        joints_cut.append(joints_cut_l)
+        bodies_cut.append(bodies_cut_l)
 
     # TODO: Clean unnecessary adhesive
-    return device, joints_cut, bodies_cut
+    return Laminate(*device), Laminate(*joints_cut), Laminate(*bodies_cut)
 
 
-def twin(device):
+def twin_transform(device):
+    # Mirror about the center and place the copy above the device
     bb = device.bounding_box_coords()
     mirror_center = [
         (bb[0][0] + bb[1][0]) / 2,
         (bb[0][1] + bb[1][1]) / 2
     ]
     dy = np.abs(bb[0][1] - bb[1][1]) + 1
+    return mirror_center, dy
+
+
+def twin(device):
+    mirror_center, dy = twin_transform(device)
     device_m = Laminate(*[
         safe_translate_layer(l, 0, dy, mirror_first=mirror_center)
         for l in device
@@ -193,6 +290,17 @@ def not_web_material(laminate, up):
     return not_web_material
 
 
+def not_web_index(i, num_layers, up):
+    # Index of the projection that not_web_material uses for layer i, i.e.
+    # not_web_material(laminate, up)[i] is the union of laminate[n:] (up) or
+    # laminate[:n + 1] (down)
+    is_adhesive = [k % 2 == 1 for k in range(num_layers)]
+    n = i - 1 if up else i + 1
+    if 0 <= n < num_layers and (is_adhesive[i] or is_adhesive[n]):
+        return n
+    return i
+
+
 def jig_holes(x, y, w, h, jig_diameter, num_layers):
     cres = 5  # independent circle res
     points = []  # jig holes
@@ -286,15 +394,10 @@ def safe_translate_layer(layer, dx, dy, mirror_first=None):
     return Layer(l)
 
 
-def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1):
-    assert clearance > 0
-    num_layers = len(device)
-    # assume alternative adhesive
-    is_adhesive = [i % 2 == 1 for i in range(num_layers)]
-
+def frame(device_union, num_layers, jig_diameter, jig_hole_spacing):
     # Build jigholes and sheet
     device_bb = (
-        mfg.unary_union(device) << jig_hole_spacing /
+        device_union << jig_hole_spacing /
         2).bounding_box()
     w, h = device_bb.get_dimensions()
     w = round(w / jig_hole_spacing) * jig_hole_spacing
@@ -307,46 +410,172 @@ def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1):
     lines = labels(xc, yc, w, h, jig_diameter, num_layers)
 
     sheet = (holes[0] << jig_diameter).bounding_box()
-    sheet = sheet.to_laminate(num_layers)
 
+    release_cut_label = labels(
+        xc, yc, w, h,
+        jig_diameter, num_layers, hide_lines=True)
+
+    return holes, lines, sheet, release_cut_label
+
+
+def projections(device):
+    # Parts of the cuts that do not depend on the parameters of cuts()
+    not_web_up = not_web_material(device, True)
+    not_web_down = not_web_material(device, False)
+    # Keepout region that laser should never cut
+    keepout = mfg.keepout_laser(device)
+    return not_web_up, not_web_down, keepout
+
+
+def layers_cuts(device, sheet, holes, lines, not_web_up, not_web_down,
+                support, clearance):
     # Identify material for web
     all_scrap = sheet - device
-    web_material_up = all_scrap - (not_web_material(device, True) << clearance)
-    web_material_down = all_scrap - \
-        (not_web_material(device, False) << clearance)
+    web_material_up = all_scrap - (not_web_up << clearance)
+    web_material_down = all_scrap - (not_web_down << clearance)
     web_material = web_material_up | web_material_down
 
     web = web_material - holes - lines  # Web that holds the device before release cut
-    # Keepout region that laser should never cut
-    keepout = mfg.keepout_laser(device)
-    release_cut_label = labels(
-        xc, yc, w, h,
-        jig_diameter, num_layers, hide_lines=True)
-    release_cut_scrap = sheet - keepout - release_cut_label
-    support = mfg.support(device, mfg.keepout_laser, clearance, 0)
     # IDEA: Support can be within the keepout region if it is part of the web
     # maeterial
-    layers_cut = web | device | support
+    return web | device | support
 
+
+def material_cuts(layers_cut, release_cut_scrap):
     device_released = layers_cut - release_cut_scrap.dilate(CUT_THICKNESS / 2)
-    material_cut = device_released.dilate(CUT_THICKNESS) & release_cut_scrap
+    return device_released.dilate(CUT_THICKNESS) & release_cut_scrap
 
-    release_cut = []  # Release cuts in individual lines
 
-    def separate(b):
-        pts = b.coords
-        for p1, p2 in zip(pts, pts[1:] + [pts[0]]):
-            release_cut.append(sg.LineString([p1, p2]))
+def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1,
+         shared=None):
+    assert clearance > 0
+    num_layers = len(device)
 
-    for g in release_cut_scrap[0].geoms:
-        if g.boundary.geom_type == 'MultiLineString':
-            for ls in g.boundary.geoms:
-                separate(ls)
-        else:
-            separate(g.boundary)
-    release_cut = Layer(sg.MultiLineString(release_cut))
+    # Reuse projections computed for other parameters if given
+    if shared is None:
+        shared = projections(device)
+    not_web_up, not_web_down, keepout = shared
 
-    release_cut_layers = []  # Cuts that need special care
+    holes, lines, sheet, release_cut_label = frame(
+        keepout[0], num_layers, jig_diameter, jig_hole_spacing)
+    sheet = sheet.to_laminate(num_layers)
+
+    support = mfg.support(
+        device, lambda laminate: keepout, clearance, 0)
+    layers_cut = layers_cuts(
+        device, sheet, holes, lines, not_web_up, not_web_down,
+        support, clearance)
+
+    release_cut_scrap = sheet - keepout - release_cut_label
+    material_cut = material_cuts(layers_cut, release_cut_scrap)
+
+    release_cut, release_cut_layers = release_cuts(
+        release_cut_scrap[0], special_cuts(material_cut))
+
+    return layers_cut, release_cut, release_cut_layers
+
+
+def twin_cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1):
+    # Plan of cuts(twin(device)) with the cuts of one copy mirrored onto the
+    # other. Only the band between the two copies and the surroundings of
+    # the jig holes and labels are recomputed, the rest of the margin is
+    # plain sheet.
+    # Layer cuts match cuts(twin(device)). Special cuts may end up to a few
+    # tenths of a mm apart along the device edges: they are grown with a
+    # round buffer of resolution 0, which turns float noise in the material
+    # cuts into visibly different ends. For the same reason cuts(twin(device))
+    # does not cut its two copies the same either.
+    assert clearance > 0
+    num_layers = len(device)
+    mirror_center, dy = twin_transform(device)
+
+    def mirrored_layer(layer):
+        return safe_translate_layer(layer, 0, dy, mirror_first=mirror_center)
+
+    def mirrored(laminate):
+        return Laminate(*[mirrored_layer(l) for l in laminate])
+
+    # Layer cuts at a point depend on the device within the clearance,
+    # material cuts on the layer cuts within about two cut thicknesses and
+    # special cuts on the material cuts within their margin
+    reach = clearance + 2 * CUT_THICKNESS + SPECIAL_MARGIN
+    (x1, y1), (x2, y2) = device.bounding_box_coords()
+    # Region around the first copy that the second one can not reach, and
+    # the band between the copies that both reach
+    near = Layer(sg.box(x1 - reach, y1 - reach, x2 + reach, y1 + dy - reach))
+    near_twin = near | mirrored_layer(near)
+    band = Layer(sg.box(x1 - reach, y1 + dy - reach, x2 + reach, y2 + reach))
+    device_twin = twin(device)
+
+    def area(laminate):
+        return sum([g.area for g in mfg.unary_union(laminate).geoms])
+
+    if area(device_twin & band.dilate(reach).to_laminate(num_layers)) > \
+            area(device) / 2:
+        # On short devices the band covers most of each copy, so mirroring
+        # saves less than it costs
+        return cuts(device_twin, jig_diameter, jig_hole_spacing, clearance)
+
+    not_web_up, not_web_down, keepout = projections(device)
+    keepout_twin = keepout | mirrored(keepout)
+    holes, lines, sheet, release_cut_label = frame(
+        keepout_twin[0], num_layers, jig_diameter, jig_hole_spacing)
+    features = mfg.unary_union(holes | lines | release_cut_label)
+    if not (features & near_twin.dilate(reach)).is_null() or \
+            not (near_twin.dilate(reach) - sheet).is_null():
+        # Jig holes, labels or the sheet edge are too close to reuse one copy
+        return cuts(device_twin, jig_diameter, jig_hole_spacing, clearance)
+
+    # Band and surroundings of the holes and labels, recomputed from the
+    # device and features around them
+    recompute = (band | features.dilate(reach)) & sheet
+    far = sheet - near_twin - recompute
+    region = recompute.dilate(reach).to_laminate(num_layers)
+    device_rest = device_twin & region
+
+    # Plan one copy on a sheet just large enough for the near region
+    near_lam = near.to_laminate(num_layers)
+    sheet_near = near.dilate(reach).bounding_box().to_laminate(num_layers)
+    no_features = Laminate(*[Layer()] * num_layers)
+    support = mfg.support(
+        device, lambda laminate: keepout, clearance, 0)
+    layers_cut_near = layers_cuts(
+        device, sheet_near, no_features, no_features,
+        not_web_up, not_web_down, support, clearance)
+    special_near = special_cuts(material_cuts(
+        layers_cut_near, sheet_near - keepout))
+    layers_cut_near &= near_lam
+    special_near &= near_lam
+
+    sheet = sheet.to_laminate(num_layers)
+    not_web_up, not_web_down, keepout = projections(device_rest)
+    support = mfg.support(
+        device_rest, lambda laminate: keepout, clearance, 0)
+    layers_cut_rest = layers_cuts(
+        device_rest, sheet & region, holes, lines,
+        not_web_up, not_web_down, support, clearance)
+    release_cut_scrap = sheet - keepout_twin - release_cut_label
+    special_rest = special_cuts(material_cuts(
+        layers_cut_rest, release_cut_scrap & region))
+
+    # Nothing is cut away from the rest of the margin. Overlap a little so
+    # the pieces merge.
+    recompute = recompute.dilate(SMALL_DIM).to_laminate(num_layers)
+    far = far.dilate(SMALL_DIM).to_laminate(num_layers) & sheet
+    layers_cut = layers_cut_near | mirrored(layers_cut_near) | \
+        (layers_cut_rest & recompute) | far
+    special = special_near | mirrored(special_near) | \
+        (special_rest & recompute)
+
+    release_cut, release_cut_layers = release_cuts(
+        release_cut_scrap[0], special)
+
+    return layers_cut, release_cut, release_cut_layers
+
+
+def special_cuts(material_cut):
+    # Regions of cuts that need special care
+    num_layers = len(material_cut)
     release_cut_layers_mpg = []
     for j in range(num_layers):
         material_cut_n = material_cut[j]
@@ -368,16 +597,35 @@ def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1):
             if g.area > (CUT_THICKNESS * 1.1)**2]
         material_cut_n = material_cut_n.erode(SMALL_DIM).dilate(SMALL_DIM)
         # Expand a bit to make sure all-the-way cuts won't affect them
-        material_cut_n = material_cut_n.dilate(0.8)
+        material_cut_n = material_cut_n.dilate(SPECIAL_MARGIN)
 
         material_cut_n_mpg = Layer(sg.MultiPolygon(material_cut_n.geoms))
-        material_cut_n_lines = release_cut & material_cut_n_mpg
-
-        release_cut_layers.append(material_cut_n_lines)
         release_cut_layers_mpg.append(material_cut_n_mpg)
 
+    return Laminate(*release_cut_layers_mpg)
+
+
+def release_cuts(release_cut_scrap, release_cut_layers_mpg):
+    release_cut = []  # Release cuts in individual lines
+
+    def separate(b):
+        pts = b.coords
+        for p1, p2 in zip(pts, pts[1:] + [pts[0]]):
+            release_cut.append(sg.LineString([p1, p2]))
+
+    for g in release_cut_scrap.geoms:
+        if g.boundary.geom_type == 'MultiLineString':
+            for ls in g.boundary.geoms:
+                separate(ls)
+        else:
+            separate(g.boundary)
+    release_cut = Layer(sg.MultiLineString(release_cut))
+
+    release_cut_layers = []  # Cuts that need special care
+    for material_cut_n_mpg in release_cut_layers_mpg:
+        material_cut_n_lines = release_cut & material_cut_n_mpg
+        release_cut_layers.append(material_cut_n_lines)
     release_cut_layers = Laminate(*release_cut_layers)
-    release_cut_layers_mpg = Laminate(*release_cut_layers_mpg)
 
     # Remove special layer cuts from the total cuts
     for rcl_mpg in release_cut_layers_mpg:
@@ -391,41 +639,67 @@ def cuts(device, jig_diameter=5, jig_hole_spacing=20, clearance=1):
     # release_cut.plot()
     # plt.show(block=True)
 
-    return layers_cut, release_cut, release_cut_layers
-
+    return release_cut, release_cut_layers
 
-def export(path, layers_cut, release_cut, release_cut_layers, plot=False):
-    num_layers = len(layers_cut)
 
-    # Prepare cuts
+def stack_offsets(layers_cut):
+    # Vertical offset of each layer when placed one above the other
     w, h = mfg.unary_union(layers_cut).bounding_box().get_dimensions()
+    step = 10
+    return [int(np.ceil(h / step) * i + i) * step if i > 0 else 0
+            for i in range(len(layers_cut))]
 
-    layers_cut_final = layers_cut[0]
-    for i in range(1, num_layers):
-        step = 10
-        d = int(np.ceil(h / step) * i + i)
-        layers_cut_final |= safe_translate_layer(layers_cut[i], 0, d * step)
 
-    if plot:
-        layers_cut_final.plot(new=True)
-        plt.figure()
-        for l in release_cut_layers:
-            l.plot()
-        release_cut.plot()
-        plt.show(block=True)
+def stack_layers(layers_cut):
+    # Every layer on a single drawing, one above the other
+    offsets = stack_offsets(layers_cut)
+
+    layers_cut_final = layers_cut[0]
+    for i in range(1, len(layers_cut)):
+        layers_cut_final |= safe_translate_layer(layers_cut[i], 0, offsets[i])
+    return layers_cut_final
+
+
+def cut_lines(layers_cut, release):
+    # Cut every edge only once. Each layer is cut from its own sheet, while
+    # the release cuts are a single job where special cuts are kept over
+    # all-the-way cuts along the same edge.
+    layers_lines = []
+    removed = 0
+    for layer in layers_cut:
+        (lines,), removed_layer = dedupe.dedupe([layer])
+        layers_lines.append(lines)
+        removed += removed_layer
+    release_lines, removed_release = dedupe.dedupe(release[1:] + release[:1])
+    release_lines = release_lines[-1:] + release_lines[:-1]
+    removed += removed_release
+
+    # Layers are placed apart, so the stacked drawing is the lines of each
+    # layer moved in place
+    layers_lines_final = Layer(*[
+        sa.translate(g, 0, dy)
+        for lines, dy in zip(layers_lines, stack_offsets(layers_cut))
+        for g in lines.geoms])
+    return layers_lines, layers_lines_final, release_lines, removed
+
+
+def layers_dxf(layers_lines_final):
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    for line in layers_lines_final.get_paths():
+        msp.add_lwpolyline(line)
+    return doc
 
-    folder_name = os.path.basename(os.path.normpath(path))
-    layers_cut_final.export_dxf(os.path.join(
-        path, '{}_layers'.format(folder_name)))
 
+def release_dxf(release_lines):
     # Different color for all-the-way cuts and special cuts
     doc = ezdxf.new('R2010')
     msp = doc.modelspace()
     c = 0
-    for line in release_cut.get_paths():
+    for line in release_lines[0].get_paths():
         msp.add_lwpolyline(line, dxfattribs={'color': c})
     c += 1
-    for l in release_cut_layers:
+    for l in release_lines[1:]:
         if len(l.get_paths()) == 0:
             continue
         for line in l.get_paths():
@@ -433,4 +707,43 @@ def export(path, layers_cut, release_cut, release_cut_layers, plot=False):
         c += 1
         if c > 6:
             print('Running out of colors for single-layer cut')
-    doc.saveas(os.path.join(path, '{}_release.dxf'.format(folder_name)))
+    return doc
+
+
+def export(path, layers_cut, release_cut, release_cut_layers, plot=False,
+           png=False, name=None, profiles=None):
+    # All-the-way cuts first, then one color per layer of special cuts
+    release = [release_cut, *release_cut_layers]
+    release_colors = ['C{:d}'.format(i) for i in range(len(release))]
+
+    layers_lines, layers_lines_final, release_lines, removed = cut_lines(
+        layers_cut, release)
+    if removed > 0:
+        print('Removed {:.3f} mm of duplicate cut lines'.format(removed))
+
+    # Output files are named after the export folder unless a name is given
+    folder_name = name or os.path.basename(os.path.normpath(path))
+
+    if plot:
+        import matplotlib.pyplot as plt
+        import preview
+        preview.plot([stack_layers(layers_cut)])
+        preview.plot(release, release_colors)
+        plt.show(block=True)
+
+    if png:
+        import preview
+        for i, layer in enumerate(layers_cut):
+            preview.save_png([layer], os.path.join(
+                path, '{}_layers_{:d}.png'.format(folder_name, i)))
+        preview.save_png(release, os.path.join(
+            path, '{}_release.png'.format(folder_name)), release_colors)
+
+    layers_dxf(layers_lines_final).saveas(os.path.join(
+        path, '{}_layers.dxf'.format(folder_name)))
+    release_dxf(release_lines).saveas(os.path.join(
+        path, '{}_release.dxf'.format(folder_name)))
+
+    # Cut length and estimated machine time next to the dxf files
+    return report.report(path, layers_lines, release_lines[0],
+                         release_lines[1:], folder_name, profiles)
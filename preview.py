@@ -0,0 +1,94 @@
+import numpy as np
+import shapely
+import shapely.geometry as sg
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+
+PIXELS = 1000  # Resolution along the longer side of the preview
+FACE_COLOR = (1, 0, 0, 0.25)
+EDGE_COLOR = (0, 0, 0, 0.5)
+
+
+def pixel_size(layers, pixels=PIXELS):
+    # Size of one pixel when all layers are fit into the preview
+    geoms = [g for layer in layers for g in layer.geoms]
+    if len(geoms) == 0:
+        return 0
+    x1, y1, x2, y2 = shapely.total_bounds(np.array(geoms, dtype=object))
+    return max(x2 - x1, y2 - y1) / pixels
+
+
+def polygon_path(poly):
+    # Exterior counter-clockwise and interiors clockwise so holes stay empty
+    poly = sg.polygon.orient(poly)
+    vertices = []
+    codes = []
+    for ring in [poly.exterior, *poly.interiors]:
+        coords = np.asarray(ring.coords)[:, :2]
+        vertices.append(coords)
+        codes.append(
+            [Path.MOVETO] + [Path.LINETO] * (len(coords) - 2) +
+            [Path.CLOSEPOLY])
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+
+def collections(layer, tolerance, color=FACE_COLOR):
+    # Decimate the layer to the tolerance and batch it into two collections
+    geoms = np.array(layer.geoms, dtype=object)
+    if len(geoms) > 0 and tolerance > 0:
+        # Drop polygons smaller than a pixel. Lines are kept since cut lines
+        # are often split into many short segments.
+        bounds = shapely.bounds(geoms)
+        size = np.maximum(bounds[:, 2] - bounds[:, 0],
+                          bounds[:, 3] - bounds[:, 1])
+        is_polygon = shapely.get_type_id(geoms) == 3
+        geoms = geoms[~is_polygon | (size >= tolerance)]
+        geoms = shapely.simplify(geoms, tolerance)
+
+    paths = []
+    lines = []
+    for g in geoms:
+        if g.is_empty:
+            continue
+        if g.geom_type == 'Polygon':
+            paths.append(polygon_path(g))
+        elif g.geom_type == 'LineString':
+            lines.append(np.asarray(g.coords)[:, :2])
+
+    result = []
+    if len(paths) > 0:
+        result.append(PathCollection(
+            paths, facecolors=[color], edgecolors=[EDGE_COLOR],
+            linewidths=0.25))
+    if len(lines) > 0:
+        result.append(LineCollection(lines, colors=[color]))
+    return result
+
+
+def draw(ax, layers, colors=None, pixels=PIXELS):
+    if colors is None:
+        colors = [FACE_COLOR] * len(layers)
+    tolerance = pixel_size(layers, pixels)
+    for layer, color in zip(layers, colors):
+        for c in collections(layer, tolerance, color):
+            ax.add_collection(c)
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+
+def plot(layers, colors=None, pixels=PIXELS):
+    # Fast replacement of Layer.plot for large layers
+    fig, ax = plt.subplots()
+    draw(ax, layers, colors, pixels)
+    return fig
+
+
+def save_png(layers, filename, colors=None, pixels=PIXELS):
+    # Rasterize without going through the interactive backend
+    fig = Figure(figsize=(pixels / 100, pixels / 100), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1])
+    draw(ax, layers, colors, pixels)
+    fig.savefig(filename)
@@ -0,0 +1,114 @@
+import os
+import csv
+import numpy as np
+
+# Speed profile of each kind of cut. Cut speeds are in mm/s and pierce times
+# in s. Values can be overridden by a speeds.csv in the export folder with the
+# columns profile, cut_speed, pierce_time.
+PROFILES = {
+    'layers': {'cut_speed': 20.0, 'pierce_time': 0.05},
+    'release': {'cut_speed': 5.0, 'pierce_time': 0.2},
+    'special': {'cut_speed': 10.0, 'pierce_time': 0.1},
+    'travel': {'cut_speed': 200.0, 'pierce_time': 0.0},
+}
+SPEEDS_FILE = 'speeds.csv'
+
+
+def profiles(path):
+    # Default profiles updated by the optional speeds file
+    speeds_path = os.path.join(path, SPEEDS_FILE)
+    if not os.path.exists(speeds_path):
+        return {k: dict(v) for k, v in PROFILES.items()}
+    with open(speeds_path, newline='') as f:
+        return parse_profiles(f)
+
+
+def parse_profiles(speeds_file, defaults=PROFILES):
+    # Profiles of a speeds file, the others are kept from defaults
+    profiles = {k: dict(v) for k, v in defaults.items()}
+    reader = csv.reader(speeds_file)
+    for i, row in enumerate(reader):
+        if i == 0:
+            continue
+        assert row[0] in profiles, 'Unknown speed profile {}, should be one of {}'.format(
+            row[0], ', '.join(profiles))
+        profiles[row[0]]['cut_speed'] = float(row[1])
+        profiles[row[0]]['pierce_time'] = float(row[2])
+    return profiles
+
+
+def path_stats(paths, start=None):
+    # Cut length, travel between paths in export order and pierce count. The
+    # head starts over the first path unless a start point is given
+    length = 0
+    travel = 0
+    position = None if start is None else np.asarray(start, dtype=float)
+    for path in paths:
+        coords = np.asarray(path, dtype=float)[:, :2]
+        length += np.linalg.norm(np.diff(coords, axis=0), axis=1).sum()
+        if position is not None:
+            travel += np.linalg.norm(coords[0] - position)
+        position = coords[-1]
+    return length, travel, len(paths), position
+
+
+def estimate(name, paths, profile, travel_profile, start=None):
+    length, travel, pierces, end = path_stats(paths, start)
+    time = (length / profile['cut_speed'] +
+            travel / travel_profile['cut_speed'] +
+            pierces * profile['pierce_time'])
+    return [name, length, travel, pierces, time], end
+
+
+def report(path, layers_cut, release_cut, release_cut_layers, name,
+           profs=None):
+    # Speeds come from the folder of the report unless given
+    if profs is None:
+        profs = profiles(path)
+    rows = table(layers_cut, release_cut, release_cut_layers, profs)
+
+    with open(os.path.join(path, '{}_report.csv'.format(name)), 'w',
+              newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['part', 'cut_length', 'travel', 'pierces', 'time'])
+        writer.writerows(rows)
+
+    return rows
+
+
+def table(layers_cut, release_cut, release_cut_layers, profs=PROFILES):
+    rows = []
+
+    # Each layer is cut from its own sheet
+    for i, layer in enumerate(layers_cut):
+        row, _ = estimate('layers_{:d}'.format(i), layer.get_paths(),
+                          profs['layers'], profs['travel'])
+        rows.append(row)
+
+    # Release cuts are one job, all-the-way cuts first then one color per
+    # layer of special cuts, in the same order as the release dxf, so each
+    # color starts where the previous one ended
+    row, end = estimate('release', release_cut.get_paths(),
+                        profs['release'], profs['travel'])
+    rows.append(row)
+    c = 1
+    for l in release_cut_layers:
+        paths = l.get_paths()
+        if len(paths) == 0:
+            continue
+        row, end = estimate('release_color_{:d}'.format(c), paths,
+                            profs['special'], profs['travel'], end)
+        rows.append(row)
+        c += 1
+
+    total = ['total', *np.sum([row[1:] for row in rows], axis=0)]
+    total[3] = int(total[3])
+    rows.append(total)
+    return rows
+
+
+def show(rows):
+    print('{:<20s} {:>12s} {:>12s} {:>8s} {:>10s}'.format(
+        'part', 'cut[mm]', 'travel[mm]', 'pierces', 'time[s]'))
+    for row in rows:
+        print('{:<20s} {:>12.1f} {:>12.1f} {:>8d} {:>10.1f}'.format(*row))
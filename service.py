@@ -0,0 +1,144 @@
+import collections
+import functools
+import hashlib
+import io
+import threading
+import data
+import joint
+import plan
+import report
+
+DEVICE_CACHE = 16  # Devices of the most recent bundles kept for reuse
+JOINT_CACHE = 4096  # Joint laminates kept per joint type
+SHAPE_CACHE = 4096  # Unique component shapes kept with instances
+
+
+def dxf_bytes(doc):
+    # The dxf file as saved by ezdxf, without touching the file system
+    stream = io.StringIO()
+    doc.write(stream)
+    return stream.getvalue().encode(doc.output_encoding)
+
+
+def bundle_key(files):
+    digest = hashlib.sha1()
+    for name in sorted(files):
+        digest.update(name.encode())
+        digest.update(hashlib.sha1(files[name]).digest())
+    return digest.hexdigest()
+
+
+def cached_joint(jf, maxsize=JOINT_CACHE):
+    # Joint functions always build the same laminates for the same line
+    @functools.lru_cache(maxsize)
+    def cached(line):
+        return jf([tuple(pt) for pt in line])
+
+    def joint_function(line):
+        return cached(tuple([tuple(pt) for pt in line]))
+
+    joint_function.cache_clear = cached.cache_clear
+    return joint_function
+
+
+class LRUCache:
+    # Mapping that only keeps the most recently used entries. Safe to share
+    # between threads.
+
+    def __init__(self, maxsize):
+        self.entries = collections.OrderedDict()
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class Pipeline:
+    # Reusable pipeline for embedding in a service. Inputs are either parsed
+    # like data.read or a bundle of the export folder files in bytes, and the
+    # cut files are returned as dxf bytes. Joint laminates, the devices of
+    # recent bundles and, with instances, recently used component shapes are
+    # kept between calls. A speeds.csv in a bundle overrides the profiles.
+    # Calls may run concurrently from several threads. Cached geometry is
+    # never modified, so threads at most build the same entry twice.
+
+    def __init__(self, joint_dicts=joint.DICTS, precise=False,
+                 instances=False, profiles=report.PROFILES,
+                 max_devices=DEVICE_CACHE, max_shapes=SHAPE_CACHE):
+        self.joint_dicts = {
+            k: cached_joint(jf) for k, jf in joint_dicts.items()}
+        self.grid_size = plan.GRID_SIZE if precise else None
+        self.profiles = profiles
+        self.instances = LRUCache(max_shapes) if instances else None
+        self.devices = LRUCache(max_devices)
+
+    def device(self, inputs=None, files=None, twin=False):
+        # Device and its projections, reused for bundles seen before
+        assert (inputs is None) != (files is None), \
+            'Either parsed inputs or a bundle of files is needed'
+        key = None
+        if files is not None:
+            key = (bundle_key(files), twin)
+            cached = self.devices.get(key)
+            if cached is not None:
+                return cached
+            inputs = data.read_bundle(files)
+
+        comps_poly, comps_circle, joints, layers = inputs
+        device, _, _ = plan.device(
+            comps_poly, comps_circle, joints, layers, self.joint_dicts,
+            self.grid_size, self.instances)
+        if twin:
+            device = plan.twin(device)
+        result = (device, plan.projections(device))
+
+        if key is not None:
+            self.devices[key] = result
+        return result
+
+    def run(self, inputs=None, files=None, twin=False, jig_diameter=5,
+            jig_hole_spacing=20, clearance=1):
+        # Layers and release dxf in bytes and the fabrication report rows
+        device, shared = self.device(inputs, files, twin)
+        layers_cut, release_cut, release_cut_layers = plan.cuts(
+            device, jig_diameter, jig_hole_spacing, clearance, shared)
+
+        release = [release_cut, *release_cut_layers]
+        layers_lines, layers_lines_final, release_lines, _ = plan.cut_lines(
+            layers_cut, release)
+
+        profiles = self.profiles
+        if files is not None and report.SPEEDS_FILE in files:
+            profiles = report.parse_profiles(io.StringIO(
+                files[report.SPEEDS_FILE].decode(), newline=''), profiles)
+        rows = report.table(
+            layers_lines, release_lines[0], release_lines[1:], profiles)
+        return (dxf_bytes(plan.layers_dxf(layers_lines_final)),
+                dxf_bytes(plan.release_dxf(release_lines)), rows)
+
+    def clear(self):
+        # Drop every cached shape, joint and device
+        if self.instances is not None:
+            self.instances.clear()
+        self.devices.clear()
+        for jf in self.joint_dicts.values():
+            jf.cache_clear()
@@ -0,0 +1,127 @@
+import concurrent.futures
+import csv
+import functools
+import itertools
+import os
+import sys
+import time
+import data
+import joint
+import plan
+import report
+
+# Parameters of plan.cuts. Joint parameters are given as JOINTTYPE.ARG,
+# e.g. plain5.w or bend5.t, and are passed to the generators in joint.DICTS.
+CUT_PARAMS = ['clearance', 'jig_diameter', 'jig_hole_spacing']
+
+
+def joint_dicts(params):
+    kwargs = {}
+    for key, value in params.items():
+        name, arg = key.split('.')
+        assert name in joint.DICTS, 'Unknown joint type {}'.format(name)
+        kwargs.setdefault(name, {})[arg] = value
+
+    dicts = dict(joint.DICTS)  # Keep the order for the default joint
+    for name in kwargs:
+        dicts[name] = functools.partial(dicts[name], **kwargs[name])
+    return dicts
+
+
+def points(grid):
+    keys = list(grid.keys())
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[grid[k] for k in keys])]
+
+
+def variant_name(folder_name, params):
+    return '_'.join([folder_name] + [
+        '{}-{:g}'.format(k, v) for k, v in params.items()])
+
+
+def evaluate(path, name, device, shared, params, profiles):
+    start = time.perf_counter()
+    layers_cut, release_cut, release_cut_layers = plan.cuts(
+        device, shared=shared, **params)
+    rows = plan.export(path, layers_cut, release_cut, release_cut_layers,
+                       name=name, profiles=profiles)
+    elapsed = time.perf_counter() - start
+
+    sizes = [
+        os.path.getsize(os.path.join(path, '{}_{}.dxf'.format(name, s)))
+        for s in ['layers', 'release']]
+    # Estimated machine time of the whole job
+    return elapsed, sizes, rows[-1][4]
+
+
+def sweep(path, grid, twin=False, workers=None):
+    # Evaluate every combination of the parameters in grid. The device and
+    # projections are only recomputed when joint parameters change, while
+    # the cuts of each point run in parallel.
+    for key in grid:
+        assert key in CUT_PARAMS or '.' in key, \
+            'Unknown sweep parameter {}'.format(key)
+    joint_grid = {k: v for k, v in grid.items() if k not in CUT_PARAMS}
+    cut_grid = {k: v for k, v in grid.items() if k in CUT_PARAMS}
+
+    polys, circles, joints, layers = data.read(path)
+    folder_name = os.path.basename(os.path.normpath(path))
+    out = os.path.join(path, 'sweep')
+    os.makedirs(out, exist_ok=True)
+    # Machine time uses the speeds of the export folder, not of the output
+    profiles = report.profiles(path)
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        for joint_point in points(joint_grid):
+            start = time.perf_counter()
+            device, joints_cut, bodies_cut = plan.device(
+                polys, circles, joints, layers, joint_dicts(joint_point))
+            if twin:
+                device = plan.twin(device)
+            shared = plan.projections(device)
+            shared_time = time.perf_counter() - start
+
+            for cut_point in points(cut_grid):
+                params = {**joint_point, **cut_point}
+                name = variant_name(folder_name, params)
+                future = executor.submit(
+                    evaluate, out, name, device, shared, cut_point, profiles)
+                results.append((name, params, shared_time, future))
+
+        rows = []
+        for name, params, shared_time, future in results:
+            elapsed, sizes, laser_time = future.result()
+            rows.append([name, shared_time, elapsed, *sizes, laser_time])
+
+    with open(os.path.join(out, 'report.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['variant', 'shared_time', 'cuts_time',
+                         'layers_bytes', 'release_bytes', 'laser_time'])
+        writer.writerows(rows)
+
+    print('{:<50s} {:>10s} {:>10s} {:>12s} {:>12s} {:>10s}'.format(
+        'variant', 'shared[s]', 'cuts[s]', 'layers[B]', 'release[B]',
+        'laser[s]'))
+    for row in rows:
+        print('{:<50s} {:>10.2f} {:>10.2f} {:>12d} {:>12d} {:>10.1f}'.format(
+            *row))
+
+    return rows
+
+
+if __name__ == '__main__':
+    # python sweep.py PATH clearance=0.5,1 plain5.w=0.5,0.6 [-t] [-j WORKERS]
+    path = sys.argv[1]
+    twin = '-t' in sys.argv
+    workers = None
+    if '-j' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('-j') + 1])
+
+    grid = {}
+    for arg in sys.argv[2:]:
+        if '=' in arg:
+            key, values = arg.split('=')
+            grid[key] = [float(v) for v in values.split(',')]
+
+    sweep(path, grid, twin=twin, workers=workers)
@@ -0,0 +1,67 @@
+import csv
+import os
+import time
+import traceback
+
+INPUT_FILES = ['layers.csv', 'rev_joints.csv', 'speeds.csv']
+
+
+def component_files(path):
+    # Dxf file of every component layer listed in layers.csv. Outputs such
+    # as the draft files can look like inputs, so only these are watched.
+    try:
+        with open(os.path.join(path, 'layers.csv'), newline='') as f:
+            rows = list(csv.reader(f))[1:]
+    except FileNotFoundError:
+        return []
+    names = []
+    for row in rows:
+        try:
+            names.append('{:d}_{}.dxf'.format(int(row[0]), row[1]))
+        except (IndexError, ValueError):
+            # Partly written, read again once layers.csv changes
+            continue
+    return names
+
+
+def inputs(path):
+    # Modified time of every file the pipeline reads from the export folder
+    mtimes = {}
+    for name in INPUT_FILES + component_files(path):
+        try:
+            mtimes[name] = os.stat(os.path.join(path, name)).st_mtime_ns
+        except FileNotFoundError:
+            # Optional or not written yet
+            continue
+    return mtimes
+
+
+def watch(path, run, interval=1):
+    # Keep the process warm and rerun the pipeline when the inputs change
+    last = inputs(path)
+    while True:
+        try:
+            run()
+        except Exception:
+            traceback.print_exc()
+        print('Watching {} for changes. Press Ctrl+C to stop.'.format(path))
+
+        try:
+            while True:
+                time.sleep(interval)
+                current = inputs(path)
+                if current == last:
+                    continue
+                # Wait until the export finishes writing
+                time.sleep(interval)
+                settled = inputs(path)
+                if settled != current:
+                    continue
+                changed = [
+                    name for name in set(last) | set(current)
+                    if last.get(name) != current.get(name)]
+                last = current
+                print('Changed: {}'.format(', '.join(sorted(changed))))
+                break
+        except KeyboardInterrupt:
+            return